@@ -5,149 +5,296 @@ Converts all solutions from latex/extraTeX/eoceSolutions/eoceSolutions.tex
 to PreTeXt XML format in source/appendix-solutions.ptx
 """
 
+import io
+import os
 import re
+import shutil
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 
 
+# Single alternation recognising every LaTeX construct handled by
+# convert_latex_to_pretext, so the text is scanned once instead of once per
+# construct. Alternatives sharing a start position are tried in order.
+# \emph and \textbf only match their opening brace; the body is found with
+# extract_braced_content so nested braces are balanced. Whitespace and ~
+# are not tokens: they stay in the literal text and are normalised after
+# the scan.
+# The align* body is an unrolled loop rather than a lazy .*?, so runs of
+# ordinary characters are consumed in one step and the closing
+# \end{align*} is only looked for at backslashes. Capturing it inside a
+# lookahead and consuming it with a backreference makes it atomic, so an
+# unterminated align* fails without backtracking through the body.
+# The leading lookahead lists every character a construct can start with,
+# letting the scanner skip other positions without trying each alternative;
+# keep it in step when adding a construct.
+_RE_LATEX_TOKEN = re.compile(
+    r'(?=[\\`$])(?:'
+    r'(?P<figfull>\\FigureFullPath\[(?P<figfull_caption>[^\]]+)\]\{[^}]+\}\{[^}]+\})'
+    r'|(?P<fig>\\Figure\[[^\]]+\]\{[^}]+\})'
+    r'|(?P<align>\\begin\{align\*\}'
+    r'(?=(?P<align_body>[^\\]*(?:\\(?!end\{align\*\})[^\\]*)*))(?P=align_body)'
+    r'\\end\{align\*\})'
+    r'|(?P<degree>\\textdegree)'
+    r'|(?P<rightarrow>\\rightarrow)'
+    r'|(?P<emph>\\emph\{)'
+    r'|(?P<bf>\\textbf\{)'
+    r'|(?P<q1>``(?P<q1_body>[^"`]+)\'\')'
+    r'|(?P<q2>``(?P<q2_body>[^"`]+)")'
+    r'|(?P<math>\$(?P<math_body>[^$]+)\$)'
+    r'|(?P<brperiod>\\\\\s*\.)'
+    r'|(?P<brnewline>\\\\\s*\n)'
+    r'|(?P<br>\\\\)'
+    r')'
+)
+_RE_AMP = re.compile(r'&(?!amp;|lt;|gt;|quot;|apos;)')
+_RE_WS = re.compile(r'[\s~]+')
+
+# PreTeXt tags and the original LaTeX delimiters for constructs with a body
+_WRAPPERS = {
+    'emph': ('<em>', '</em>', '\\emph{', '}'),
+    'bf': ('<alert>', '</alert>', '\\textbf{', '}'),
+    'q1': ('<q>', '</q>', '``', "\'\'"),
+    'q2': ('<q>', '</q>', '``', '"'),
+    'math': ('<m>', '</m>', '$', '$'),
+}
+
+# Fixed character escapes, each applied in one str.translate pass
+_FIGURE_CAPTION_TABLE = str.maketrans({'"': '&quot;'})
+_DISPLAY_MATH_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+_INLINE_MATH_TABLE = str.maketrans({'<': '\\lt', '>': '\\gt'})
+
+# Patterns used by parse_solutions, which scans the undecoded file bytes
+_RE_CHAPTER = re.compile(rb'\\eocesolch\{([^}]+)\}')
+_RE_COMMENT = re.compile(rb'%\s*(\d+)\s*\n')
+_RE_EOCESOL = re.compile(rb'\\eocesol\s*\{')
+
+# Patterns used by create_pretext_solution
+# Matches one (a), (b), ... part marker and the text up to the next marker,
+# only checking for a marker where the text has an opening parenthesis
+_RE_PART = re.compile(r'\(([a-z])\)\s*([^(]*(?:\((?![a-z]\))[^(]*)*)')
+_RE_TRAILING_PERIOD = re.compile(r'\.\s*$')
+
+# Solution element templates used by create_pretext_solution
+_SOL_SINGLE = (
+    '    <solution>\n'
+    '      <title>Exercise {num}</title>\n'
+    '      <p>\n'
+    '        {body}\n'
+    '      </p>\n'
+    '    </solution>\n'
+)
+_SOL_MULTI_HEAD = (
+    '    <solution>\n'
+    '      <title>Exercise {num}</title>\n'
+    '      <p>\n'
+    '        <ol marker="(a)">\n'
+)
+_SOL_MULTI_ITEM = '          <li>{body}</li>\n'
+_SOL_MULTI_TAIL = (
+    '        </ol>\n'
+    '      </p>\n'
+    '    </solution>\n'
+)
+
+# Write buffer size for the generated PreTeXt file
+_OUTPUT_BUFFER_SIZE = 256 * 1024
+
+# Below this many solutions the whole conversion takes less time than
+# starting a process pool (about 45us per solution against 5-30ms to
+# start 1-8 workers), so it runs serially
+_PARALLEL_MIN_SOLUTIONS = 2000
+
+# Chapter name mapping
+_CHAPTER_IDS = {
+    'Introduction to data': 'ch01',
+    'Summarizing data': 'ch02',
+    'Probability': 'ch03',
+    'Distributions of random variables': 'ch04',
+    'Foundations for inference': 'ch05',
+    'Inference for categorical data': 'ch06',
+    'Inference for numerical data': 'ch07',
+    'Introduction to linear regression': 'ch08',
+    'Multiple and logistic regression': 'ch09'
+}
+
+
+def _escape_text(text):
+    """Escape ampersands that aren't already part of entities"""
+    return _RE_AMP.sub('&amp;', text)
+
+
+def _escape_figure_caption(text):
+    """Escape regular quotes inside a [Figure: ] block"""
+    return text.translate(_FIGURE_CAPTION_TABLE)
+
+
+def _escape_display_math(text):
+    """Escape XML markup inside a [Math: ] block"""
+    return text.translate(_DISPLAY_MATH_TABLE)
+
+
+def _escape_inline_math(text):
+    """Escape < and > inside <m></m>"""
+    return text.translate(_INLINE_MATH_TABLE)
+
+
+def _braced_body(text, brace_pos):
+    """Return the {...} body at brace_pos and the position after it
+
+    If the braces don't balance, the body runs to the first closing brace.
+    Returns (None, brace_pos) if there is no closing brace at all.
+    """
+    body, end = extract_braced_content(text, brace_pos)
+    if end is None:
+        close_pos = text.find('}', brace_pos + 1)
+        if close_pos == -1:
+            return None, brace_pos
+        body, end = text[brace_pos + 1:close_pos], close_pos + 1
+    return body, end
+
+
+def _convert_wrapped(out, kind, body, escape):
+    """Append body, converted and wrapped in the PreTeXt tags for kind, to out
+
+    A body that converts to nothing (such as a lone line break) keeps its
+    original LaTeX delimiters instead of becoming an empty element.
+    """
+    open_tag, close_tag, open_latex, close_latex = _WRAPPERS[kind]
+    start = len(out)
+    out.append(open_tag)
+    _convert_into(out, body, escape)
+    if any(out[start + 1:]):
+        out.append(close_tag)
+    else:
+        out[start] = open_latex
+        out.append(close_latex)
+
+
+def _convert_into(out, text, escape):
+    """Scan text once, appending its PreTeXt conversion to out
+
+    Literal text between recognised constructs is passed through escape,
+    which is how the surrounding block decides its own escaping rules.
+    Constructs with a body are converted recursively into the same list.
+    """
+    pos = 0
+    while True:
+        match = _RE_LATEX_TOKEN.search(text, pos)
+        if not match:
+            break
+        if match.start() > pos:
+            out.append(escape(text[pos:match.start()]))
+        pos = match.end()
+        kind = match.lastgroup
+
+        if kind == 'brnewline':
+            out.append(' ')
+        elif kind == 'br':
+            pass
+        elif kind == 'brperiod':
+            out.append('.')
+        elif kind == 'degree':
+            out.append('°')
+        elif kind == 'rightarrow':
+            out.append('\\to')
+        elif kind == 'math':
+            _convert_wrapped(out, kind, match.group('math_body'), _escape_inline_math)
+        elif kind == 'emph' or kind == 'bf':
+            body, end = _braced_body(text, match.end() - 1)
+            if body is None:
+                out.append(match.group())
+                continue
+            _convert_wrapped(out, kind, body, escape)
+            pos = end
+        elif kind == 'q1' or kind == 'q2':
+            _convert_wrapped(out, kind, match.group(kind + '_body'), escape)
+        elif kind == 'align':
+            out.append('[Math: ')
+            _convert_into(out, match.group('align_body'), _escape_display_math)
+            out.append(']')
+        elif kind == 'figfull':
+            out.append('[Figure: ')
+            _convert_into(out, match.group('figfull_caption'), _escape_figure_caption)
+            out.append(']')
+        elif kind == 'fig':
+            out.append('[Figure]')
+
+    if pos < len(text):
+        out.append(escape(text[pos:]))
+
+
+@lru_cache(maxsize=4096)
 def convert_latex_to_pretext(latex_content):
-    """Convert LaTeX content to PreTeXt XML format"""
-    
-    content = latex_content
-    
-    # Handle figure commands - remove them for now or convert to comments
-    content = re.sub(r'\\FigureFullPath\[([^\]]+)\]\{[^}]+\}\{[^}]+\}', 
-                     r'[Figure: \1]', content)
-    content = re.sub(r'\\Figure\[[^\]]+\]\{[^}]+\}', '[Figure]', content)
-    
-    # Handle LaTeX degree symbol
-    content = content.replace('\\textdegree', '°')
-    
-    # Handle LaTeX math environments - convert to inline math or note
-    # These typically need display math <md> or <me> tags in PreTeXt
-    # First, protect them by replacing & with a placeholder
-    def protect_math_env(match):
-        math_content = match.group(1)
-        # Replace & with placeholder
-        math_content = math_content.replace('&', '¤AMPERSAND¤')
-        return f'[Math: {math_content}]'
-    
-    content = re.sub(r'\\begin\{align\*\}(.*?)\\end\{align\*\}', 
-                     protect_math_env, content, flags=re.DOTALL)
-    content = re.sub(r'\{\\footnotesize\\begin\{align\*\}(.*?)\\end\{align\*\}\}', 
-                     protect_math_env, content, flags=re.DOTALL)
-    
-    # Remove line breaks and clean whitespace
-    content = re.sub(r'\\\\\s*\.', '.', content)  # Remove LaTeX line breaks with period
-    content = re.sub(r'\\\\\s*\n', ' ', content)  # Remove LaTeX line breaks
-    content = re.sub(r'\\\\', '', content)  # Remove remaining LaTeX line breaks
-    content = re.sub(r'\s+', ' ', content)  # Normalize whitespace
-    content = content.strip()
-    
-    # Replace ~ with proper space
-    content = content.replace('~', ' ')
-    
-    # Replace \emph{} with <em></em> - handle nested braces
-    def replace_emph(match):
-        inner = match.group(1)
-        return f'<em>{inner}</em>'
-    content = re.sub(r'\\emph\{([^}]+)\}', replace_emph, content)
-    
-    # Replace \textbf{} with <alert></alert>
-    content = re.sub(r'\\textbf\{([^}]+)\}', r'<alert>\1</alert>', content)
-    
-    # Replace LaTeX double quotes with <q> tags
-    # Handle mixed quotes - `` with either '' or "
-    content = re.sub(r'``([^"`]+)\'\'', r'<q>\1</q>', content)  # `` ... ''
-    content = re.sub(r'``([^"`]+)"', r'<q>\1</q>', content)  # `` ... "
-    
-    # Handle regular quotes inside [Figure: ] blocks - escape them
-    def escape_figure_quotes(match):
-        text = match.group(1)
-        text = text.replace('"', '&quot;')
-        return f'[Figure: {text}]'
-    content = re.sub(r'\[Figure: ([^\]]+)\]', escape_figure_quotes, content)
-    
-    # Handle math blocks - escape < and > but restore ¤AMPERSAND¤ back to &amp;
-    def escape_math_markup(match):
-        text = match.group(1)
-        text = text.replace('<', '&lt;')
-        text = text.replace('>', '&gt;')
-        text = text.replace('¤AMPERSAND¤', '&amp;')
-        return f'[Math: {text}]'
-    content = re.sub(r'\[Math: ([^\]]+)\]', escape_math_markup, content)
-    
-    # Replace \rightarrow with proper arrow
-    content = content.replace('\\rightarrow', '\\to')
-    
-    # Replace $...$ inline math with <m>...</m>
-    # Handle nested dollar signs carefully
-    def replace_math(match):
-        math_content = match.group(1)
-        # Escape < and > in math
-        math_content = math_content.replace('<', '\\lt')
-        math_content = math_content.replace('>', '\\gt')
-        return f'<m>{math_content}</m>'
-    content = re.sub(r'\$([^\$]+)\$', replace_math, content)
-    
-    # Replace special XML characters (but not in our XML tags)
-    # We need to escape & to &amp; but only when it's not already part of an entity
-    # and not in <m> tags
-    parts = re.split(r'(<m>.*?</m>|<em>.*?</em>|<alert>.*?</alert>|<q>.*?</q>|\[Figure:[^\]]+\]|\[Math:[^\]]+\])', content)
-    for i in range(len(parts)):
-        # Only escape text parts, not tag parts
-        if not parts[i].startswith('<') and not parts[i].startswith('['):
-            # Escape ampersands that aren't already part of entities
-            parts[i] = re.sub(r'&(?!amp;|lt;|gt;|quot;|apos;)', '&amp;', parts[i])
-    content = ''.join(parts)
-    
-    # Clean up extra spaces again
-    content = re.sub(r'\s+', ' ', content)
-    content = content.strip()
-    
-    return content
+    """Convert LaTeX content to PreTeXt XML format
+
+    Results are cached, since short answers and multi-part items repeat.
+    """
+    
+    # Convert figures, display and inline math, emphasis, quotes and line
+    # breaks in a single scan over the content. Ampersands are escaped only
+    # in plain text; tag and block contents choose their own escaping as
+    # they are converted.
+    out = []
+    _convert_into(out, latex_content, _escape_text)
+    
+    # Replace ~ with proper space and normalize whitespace
+    return _RE_WS.sub(' ', ''.join(out)).strip()
 
 
 def extract_braced_content(text, start_pos):
-    """Extract content within braces, handling nested braces"""
-    if start_pos >= len(text) or text[start_pos] != '{':
-        return None, start_pos
+    """Extract content within braces, handling nested braces
+
+    If the braces are never closed, the rest of the text is returned with
+    None as the end position. text may be str or bytes; the result has the
+    same type.
+    """
+    if isinstance(text, bytes):
+        open_brace, close_brace = b'{', b'}'
+    else:
+        open_brace, close_brace = '{', '}'
     
-    depth = 0
-    i = start_pos
-    result = []
+    if start_pos >= len(text) or text[start_pos:start_pos + 1] != open_brace:
+        return None, start_pos
     
-    while i < len(text):
-        char = text[i]
-        if char == '{':
+    # Jump between brace characters with find() rather than stepping
+    # through the text one character at a time
+    depth = 1
+    i = start_pos + 1
+    
+    while True:
+        close_pos = text.find(close_brace, i)
+        if close_pos == -1:
+            # Unbalanced braces - return everything after the opening brace
+            return text[start_pos + 1:], None
+        open_pos = text.find(open_brace, i, close_pos)
+        if open_pos != -1:
             depth += 1
-            if depth > 1:  # Don't include the outer braces
-                result.append(char)
-        elif char == '}':
+            i = open_pos + 1
+        else:
             depth -= 1
             if depth == 0:
-                return ''.join(result), i + 1
-            result.append(char)
-        else:
-            if depth > 0:
-                result.append(char)
-        i += 1
-    
-    return ''.join(result), i
+                return text[start_pos + 1:close_pos], close_pos + 1
+            i = close_pos + 1
 
 
 def parse_solutions(latex_file_path):
     """Parse the LaTeX solutions file and extract all solutions by chapter"""
     
-    with open(latex_file_path, 'r', encoding='utf-8') as f:
+    # Scan the raw bytes and only decode the pieces that are kept. The
+    # markers are ASCII, so they can't match inside a multi-byte character.
+    with open(latex_file_path, 'rb') as f:
         content = f.read()
     
     # Find all chapter sections
     chapters = []
-    chapter_pattern = r'\\eocesolch\{([^}]+)\}'
-    chapter_matches = list(re.finditer(chapter_pattern, content))
+    chapter_matches = list(_RE_CHAPTER.finditer(content))
     
     for i, match in enumerate(chapter_matches):
-        chapter_name = match.group(1)
+        chapter_name = match.group(1).decode('utf-8')
         start_pos = match.end()
         
         # Find the end position (start of next chapter or end of file)
@@ -161,138 +308,161 @@ def parse_solutions(latex_file_path):
         # Extract all solutions in this chapter
         solutions = []
         
-        # Find all exercise comments and \eocesol commands
+        # Find all exercise comments and \eocesol commands, searching from
+        # pos rather than slicing so each step doesn't copy the rest
         pos = 0
         while pos < len(chapter_content):
             # Look for exercise number comment
-            comment_match = re.search(r'%\s*(\d+)\s*\n', chapter_content[pos:])
+            comment_match = _RE_COMMENT.search(chapter_content, pos)
             if not comment_match:
                 break
             
-            exercise_num = comment_match.group(1)
-            comment_end = pos + comment_match.end()
+            exercise_num = comment_match.group(1).decode('ascii')
+            comment_end = comment_match.end()
             
             # Look for \eocesol{ after the comment
-            eocesol_match = re.search(r'\\eocesol\s*\{', chapter_content[comment_end:])
+            eocesol_match = _RE_EOCESOL.search(chapter_content, comment_end)
             if not eocesol_match:
                 pos = comment_end
                 continue
             
             # Extract the braced content
-            brace_start = comment_end + eocesol_match.end() - 1
+            brace_start = eocesol_match.end() - 1
             solution_text, _ = extract_braced_content(chapter_content, brace_start)
             
             if solution_text:
-                solutions.append((exercise_num, solution_text))
+                solutions.append((exercise_num, solution_text.decode('utf-8')))
             
-            pos = comment_end + eocesol_match.end()
+            pos = eocesol_match.end()
         
         chapters.append({
             'name': chapter_name,
+            'title': chapter_name.title(),
+            'id': _CHAPTER_IDS.get(chapter_name, 'chXX'),
             'solutions': solutions
         })
     
     return chapters
 
 
-def create_pretext_solution(exercise_num, solution_text):
-    """Create a PreTeXt solution element"""
+def create_pretext_solution(exercise_num, solution_text, out):
+    """Write a PreTeXt solution element to the text stream out"""
     
-    # Check if solution has multiple parts (a), (b), etc.
-    parts = re.split(r'\(([a-z])\)\s*', solution_text)
+    # Check if solution has multiple parts (a), (b), etc. - only when the
+    # first part marker is preceded by nothing but whitespace
+    first_part = _RE_PART.search(solution_text)
     
-    if len(parts) > 1 and parts[0].strip() == '':
+    if first_part and solution_text[:first_part.start()].strip() == '':
         # Multi-part solution
-        lines = []
-        lines.append(f'    <solution>')
-        lines.append(f'      <title>Exercise {exercise_num}</title>')
-        lines.append('      <p>')
-        lines.append('        <ol marker="(a)">')
+        out.write(_SOL_MULTI_HEAD.format(num=exercise_num))
         
         # Process parts
-        i = 1
-        while i < len(parts):
-            if i + 1 < len(parts):
-                letter = parts[i]
-                text = parts[i + 1].strip()
-                # Remove trailing period before next part
-                text = re.sub(r'\.\s*$', '', text)
-                converted_text = convert_latex_to_pretext(text)
-                # Add period if not already there
-                if not converted_text.endswith('.'):
-                    converted_text += '.'
-                lines.append(f'          <li>{converted_text}</li>')
-                i += 2
-            else:
-                i += 1
+        for part in _RE_PART.finditer(solution_text, first_part.start()):
+            text = part.group(2).strip()
+            # Remove trailing period before next part
+            text = _RE_TRAILING_PERIOD.sub('', text)
+            converted_text = convert_latex_to_pretext(text)
+            # Add period if not already there
+            if not converted_text.endswith('.'):
+                converted_text += '.'
+            out.write(_SOL_MULTI_ITEM.format(body=converted_text))
         
-        lines.append('        </ol>')
-        lines.append('      </p>')
-        lines.append('    </solution>')
+        out.write(_SOL_MULTI_TAIL)
         
     else:
         # Single part solution
         converted_text = convert_latex_to_pretext(solution_text)
-        lines = []
-        lines.append(f'    <solution>')
-        lines.append(f'      <title>Exercise {exercise_num}</title>')
-        lines.append(f'      <p>')
-        lines.append(f'        {converted_text}')
-        lines.append('      </p>')
-        lines.append('    </solution>')
-    
-    return '\n'.join(lines)
+        out.write(_SOL_SINGLE.format(num=exercise_num, body=converted_text))
 
 
-def generate_pretext_file(chapters, output_path):
-    """Generate the complete PreTeXt solutions file"""
-    
-    lines = []
-    lines.append('<?xml version="1.0" encoding="UTF-8" ?>')
-    lines.append('')
-    lines.append('<appendix xmlns:xi="http://www.w3.org/2001/XInclude" xml:id="appendix-solutions">')
-    lines.append('  <title>Exercise Solutions</title>')
-    lines.append('')
-    lines.append('  <introduction>')
-    lines.append('    <p>')
-    lines.append('      This appendix contains solutions to selected odd-numbered exercises from each chapter.')
-    lines.append('      These solutions are provided to help you check your work and understand the problem-solving process.')
-    lines.append('    </p>')
-    lines.append('  </introduction>')
-    lines.append('')
-    
-    # Chapter name mapping
-    chapter_ids = {
-        'Introduction to data': 'ch01',
-        'Summarizing data': 'ch02',
-        'Probability': 'ch03',
-        'Distributions of random variables': 'ch04',
-        'Foundations for inference': 'ch05',
-        'Inference for categorical data': 'ch06',
-        'Inference for numerical data': 'ch07',
-        'Introduction to linear regression': 'ch08',
-        'Multiple and logistic regression': 'ch09'
-    }
-    
+def _convert_one(solution):
+    """Convert one (exercise_num, solution_text) pair to its solution XML
+
+    Module-level so it can be dispatched to ProcessPoolExecutor workers.
+    """
+    exercise_num, solution_text = solution
+    out = io.StringIO()
+    create_pretext_solution(exercise_num, solution_text, out)
+    return out.getvalue()
+
+
+def _write_sections(out, chapters, solution_xmls):
+    """Write one section per chapter, taking its solutions from solution_xmls
+
+    solution_xmls yields the converted solutions of every chapter in order.
+    """
+    solution_xmls = iter(solution_xmls)
     for chapter in chapters:
-        chapter_id = chapter_ids.get(chapter['name'], 'chXX')
-        lines.append(f'  <section xml:id="solutions-{chapter_id}">')
-        lines.append(f'    <title>{chapter["name"].title()}</title>')
-        lines.append('')
+        out.write(f'  <section xml:id="solutions-{chapter["id"]}">\n')
+        out.write(f'    <title>{chapter["title"]}</title>\n')
+        out.write('\n')
         
-        for exercise_num, solution_text in chapter['solutions']:
-            solution_xml = create_pretext_solution(exercise_num, solution_text)
-            lines.append(solution_xml)
-            lines.append('')
+        for solution_xml in islice(solution_xmls, len(chapter['solutions'])):
+            out.write(solution_xml)
+            out.write('\n')
         
-        lines.append('  </section>')
-        lines.append('')
+        out.write('  </section>\n')
+        out.write('\n')
+
+
+def _write_pretext(out, chapters):
+    """Write the complete PreTeXt solutions document to the text stream out"""
+    
+    out.write('<?xml version="1.0" encoding="UTF-8" ?>\n')
+    out.write('\n')
+    out.write('<appendix xmlns:xi="http://www.w3.org/2001/XInclude" xml:id="appendix-solutions">\n')
+    out.write('  <title>Exercise Solutions</title>\n')
+    out.write('\n')
+    out.write('  <introduction>\n')
+    out.write('    <p>\n')
+    out.write('      This appendix contains solutions to selected odd-numbered exercises from each chapter.\n')
+    out.write('      These solutions are provided to help you check your work and understand the problem-solving process.\n')
+    out.write('    </p>\n')
+    out.write('  </introduction>\n')
+    out.write('\n')
+    
+    # Solutions are independent, so larger files convert them across worker
+    # processes in one map over every chapter; map() yields results in order
+    # so the output is unchanged
+    solutions = [solution for chapter in chapters for solution in chapter['solutions']]
+    workers = os.cpu_count() or 1
+    if len(solutions) < _PARALLEL_MIN_SOLUTIONS or workers < 2:
+        _write_sections(out, chapters, map(_convert_one, solutions))
+    else:
+        chunksize = -(-len(solutions) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            _write_sections(out, chapters,
+                            executor.map(_convert_one, solutions, chunksize=chunksize))
     
-    lines.append('</appendix>')
+    out.write('</appendix>')
+
+
+def generate_pretext_file(chapters, output_path):
+    """Generate the complete PreTeXt solutions file"""
     
-    # Write the file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(lines))
+    # Stream each fragment into a temporary file next to the output, with a
+    # large buffer to keep the number of write calls down, and only move it
+    # over output_path once everything has converted so a failure leaves
+    # the existing file intact
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(output_path)),
+        prefix='.' + os.path.basename(output_path) + '.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', buffering=_OUTPUT_BUFFER_SIZE) as out:
+            _write_pretext(out, chapters)
+        # mkstemp creates the file readable only by its owner, so give it
+        # the mode of the file it replaces, or the usual umask-derived mode
+        # for a new file
+        try:
+            shutil.copymode(output_path, tmp_path)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
     
     print(f"Generated PreTeXt solutions file: {output_path}")
     print(f"Total chapters: {len(chapters)}")
@@ -0,0 +1,17 @@
+#!/bin/bash
+# Run convert_solutions_latex_to_pretext.py under PyPy when it is installed
+# The converter is pure-Python regex and string work, which PyPy's JIT runs
+# considerably faster than CPython; fall back to python3 otherwise
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+
+# The converter reads and writes paths relative to the repository root
+cd "$SCRIPT_DIR/.."
+
+if command -v pypy3 > /dev/null 2>&1; then
+    # Larger nursery means fewer minor collections for the many short-lived strings
+    export PYPY_GC_NURSERY="${PYPY_GC_NURSERY:-16M}"
+    exec pypy3 "$SCRIPT_DIR/convert_solutions_latex_to_pretext.py" "$@"
+fi
+
+exec python3 "$SCRIPT_DIR/convert_solutions_latex_to_pretext.py" "$@"